@@ -1,10 +1,8 @@
 import requests
 import json
 import pandas as pd
-import os
 from urllib.parse import urljoin
 from fake_useragent import UserAgent
-from .utils import Utility 
 from .token_manager import TokenManager
 from typing import TYPE_CHECKING
 import logging
@@ -62,7 +60,7 @@ class DatasetManager:
 
         except requests.RequestException as e:
             print(f"Request failed: {e}")
-            if hasattr(e, 'response'):
+            if e.response is not None:
                 print(f"Response status code: {e.response.status_code}")
                 print(f"Response content: {e.response.text[:200]}...")
             return None, None
@@ -89,7 +87,9 @@ class DatasetManager:
             response.raise_for_status()
             return f"Dataset with ID {dataset_id} deleted successfully!"
         except requests.RequestException as e:
-            if e.response.status_code == 401:
+            if e.response is None:
+                return f"Failed to delete dataset: {e}"
+            elif e.response.status_code == 401:
                 return "Unauthorized: Invalid or missing token."
             elif e.response.status_code == 404:
                 return f"Dataset with ID {dataset_id} not found."
@@ -212,14 +212,14 @@ class DatasetManager:
         headers = self._get_headers()
         headers.pop('Content-Type', None)  # Remove Content-Type for file upload
         
-        temp_file_path = Utility.create_temp_csv(table_data)
+        # Serialize the CSV in memory instead of round-tripping through a temp file
+        csv_bytes = table_data.to_csv(index=False).encode('utf-8')
         
         try:
-            with open(temp_file_path, 'rb') as file:
-                files = {'file': (file.name, file, 'text/csv')}
-                data = {'name': table_name}
-                
-                response = requests.post(url, headers=headers, data=data, files=files, timeout=30)
+            files = {'file': (f"{table_name}.csv", csv_bytes, 'text/csv')}
+            data = {'name': table_name}
+            
+            response = requests.post(url, headers=headers, data=data, files=files, timeout=30)
             
             response.raise_for_status()
             response_data = response.json()
@@ -236,14 +236,6 @@ class DatasetManager:
         except requests.RequestException as e:
             print(f"Request error occurred: {e}")
             return None
-        
-        except IOError as e:
-            print(f"File I/O error occurred: {e}")
-            return None
-        
-        finally:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
     
     def list_tables_in_dataset(self, dataset_id):
         """
@@ -292,7 +284,9 @@ class DatasetManager:
             response.raise_for_status()
             print(f"Table '{table_name}' deleted successfully!")
         except requests.RequestException as e:
-            if e.response.status_code == 401:
+            if e.response is None:
+                print(f"Failed to delete table: {e}")
+            elif e.response.status_code == 401:
                 print("Unauthorized: Invalid or missing token.")
             elif e.response.status_code == 404:
                 print(f"Table '{table_name}' not found in the dataset.")
@@ -317,7 +311,9 @@ class DatasetManager:
                 response.raise_for_status()
                 print(f"Table with ID '{table_id}' deleted successfully!")
             except requests.RequestException as e:
-                if e.response.status_code == 401:
+                if e.response is None:
+                    print(f"Failed to delete table with ID '{table_id}': {e}")
+                elif e.response.status_code == 401:
                     print(f"Unauthorized: Invalid or missing token for table ID '{table_id}'.")
                 elif e.response.status_code == 404:
                     print(f"Table with ID '{table_id}' not found in the dataset.")
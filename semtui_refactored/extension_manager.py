@@ -1,13 +1,20 @@
 import requests
 import json
+import time
+import logging
+import orjson
 import copy
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 from copy import deepcopy
 from .token_manager import TokenManager
+from .utils import calculate_annotation_stats, create_session
+
+logger = logging.getLogger(__name__)
 
 class ExtensionManager:
-    def __init__(self, base_url, token):
+    def __init__(self, base_url, token, session=None, cache_ttl=300):
         self.base_url = base_url.rstrip('/') + '/'
         self.api_url = urljoin(self.base_url, 'api/extenders')
         self.token = token
@@ -16,48 +23,55 @@ class ExtensionManager:
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         }
+        # Only a session created here carries the headers as defaults; an
+        # injected one may be shared, so the headers go on each request instead
+        self.session = session if session is not None else create_session(headers=self.headers)
+        self.cache_ttl = cache_ttl
+        self._extender_cache = None
+        self._extender_cache_ts = 0
+        self._extender_by_id = {}
 
     def create_backend_payload(self, reconciled_json):
-        nCellsReconciliated = sum(
-            1 for row in reconciled_json['rows'].values()
-            for cell in row['cells'].values()
-            if cell.get('annotationMeta', {}).get('annotated', False)
-        )
-        all_scores = [
-            cell.get('annotationMeta', {}).get('lowestScore', float('inf'))
-            for row in reconciled_json['rows'].values()
-            for cell in row['cells'].values()
-            if cell.get('annotationMeta', {}).get('annotated', False)
-        ]
-        minMetaScore = min(all_scores) if all_scores else 0
-        maxMetaScore = max(all_scores) if all_scores else 1
+        table_data = reconciled_json['table']
+        columns = reconciled_json['columns']
+        rows = reconciled_json['rows']
+        nCellsReconciliated, minMetaScore, maxMetaScore = calculate_annotation_stats(rows)
         payload = {
             "tableInstance": {
-                "id": reconciled_json['table']['id'],
-                "idDataset": reconciled_json['table']['idDataset'],
-                "name": reconciled_json['table']['name'],
-                "nCols": reconciled_json["table"]["nCols"],
-                "nRows": reconciled_json["table"]["nRows"],
-                "nCells": reconciled_json["table"]["nCells"],
+                "id": table_data['id'],
+                "idDataset": table_data['idDataset'],
+                "name": table_data['name'],
+                "nCols": table_data["nCols"],
+                "nRows": table_data["nRows"],
+                "nCells": table_data["nCells"],
                 "nCellsReconciliated": nCellsReconciliated,
-                "lastModifiedDate": reconciled_json["table"]["lastModifiedDate"],
+                "lastModifiedDate": table_data["lastModifiedDate"],
                 "minMetaScore": minMetaScore,
                 "maxMetaScore": maxMetaScore
             },
             "columns": {
-                "byId": reconciled_json['columns'],
-                "allIds": list(reconciled_json['columns'].keys())
+                "byId": columns,
+                "allIds": list(columns)
             },
             "rows": {
-                "byId": reconciled_json['rows'],
-                "allIds": list(reconciled_json['rows'].keys())
+                "byId": rows,
+                "allIds": list(rows)
             }
         }
         return payload
 
     def prepare_input_data(self, table, reconciliated_column_name, id_extender, properties, date_column_name=None, decimal_format=None):
-        dates = {row_id: [row['cells'][date_column_name]['label'], [], date_column_name] for row_id, row in table['rows'].items()} if date_column_name else {}
-        items = {reconciliated_column_name: {row_id: row['cells'][reconciliated_column_name]['metadata'][0]['id'] for row_id, row in table['rows'].items()}}
+        dates = {}
+        column_items = {}
+        if date_column_name:
+            for row_id, row in table['rows'].items():
+                cells = row['cells']
+                column_items[row_id] = cells[reconciliated_column_name]['metadata'][0]['id']
+                dates[row_id] = [cells[date_column_name]['label'], [], date_column_name]
+        else:
+            for row_id, row in table['rows'].items():
+                column_items[row_id] = row['cells'][reconciliated_column_name]['metadata'][0]['id']
+        items = {reconciliated_column_name: column_items}
         weather_params = properties if date_column_name else []
         decimal_format = [decimal_format] if decimal_format else []
 
@@ -71,21 +85,16 @@ class ExtensionManager:
         return payload
 
     def prepare_input_data_reconciledColumnExt(self, table, reconciliated_column_name, properties, id_extender):
-        column_data = {
-            row_id: [
-                row['cells'][reconciliated_column_name]['label'],
-                row['cells'][reconciliated_column_name].get('metadata', []),
-                reconciliated_column_name
-            ] for row_id, row in table['rows'].items()
-        }
-        items = {
-            reconciliated_column_name: {
-                row_id: row['cells'][reconciliated_column_name]['metadata'][0]['id']
-                for row_id, row in table['rows'].items()
-                if 'metadata' in row['cells'][reconciliated_column_name] and row['cells'][reconciliated_column_name]['metadata']
-            }
-        }
-    
+        column_data = {}
+        column_items = {}
+        for row_id, row in table['rows'].items():
+            cell = row['cells'][reconciliated_column_name]
+            metadata = cell.get('metadata', [])
+            column_data[row_id] = [cell['label'], metadata, reconciliated_column_name]
+            if metadata:
+                column_items[row_id] = metadata[0]['id']
+        items = {reconciliated_column_name: column_items}
+
         payload = {
             "serviceId": id_extender,
             "column": column_data,
@@ -96,26 +105,29 @@ class ExtensionManager:
     
     def send_extension_request(self, payload):
         try:
-            print("Sending payload to extender service:")
-            print(json.dumps(payload, indent=2))
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
+            logger.debug("Sending payload to extender service: %s", payload)
+            response = self.session.post(self.api_url, data=orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS), headers=self.headers)
             response.raise_for_status()
-            print("Received response from extender service:")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response Content: {response.text}")
-            return response.json()
+            logger.debug("Received response from extender service: status %s", response.status_code)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response content: %s", response.text)
+            return orjson.loads(response.content)
         except requests.exceptions.HTTPError as http_err:
-            print(f"HTTP error occurred: {http_err}")
-            if response is not None:
-                print(f"Response Content: {response.text}")
+            self.clear_extender_cache()
+            logger.error("HTTP error occurred: %s", http_err)
+            if http_err.response is not None:
+                logger.error("Response content: %s", http_err.response.text)
             raise
-        except Exception as err:
-            print(f"An error occurred: {err}")
+        except Exception:
+            self.clear_extender_cache()
+            logger.exception("An error occurred while sending the extension request")
             raise
 
     def compose_extension_table(self, table, extension_response):
+        columns = table['columns']
+        cells_by_row = {row_id: row['cells'] for row_id, row in table['rows'].items()}
         for column_name, column_data in extension_response['columns'].items():
-            table['columns'][column_name] = {
+            columns[column_name] = {
                 'id': column_name,
                 'label': column_data['label'],
                 'status': 'extended',
@@ -124,9 +136,10 @@ class ExtensionManager:
                 'kind': 'extended',
                 'annotationMeta': {}
             }
+            id_suffix = f"${column_name}"
             for row_id, cell_data in column_data['cells'].items():
-                table['rows'][row_id]['cells'][column_name] = {
-                    'id': f"{row_id}${column_name}",
+                cells_by_row[row_id][column_name] = {
+                    'id': f"{row_id}{id_suffix}",
                     'label': cell_data['label'],
                     'metadata': cell_data['metadata']
                 }
@@ -139,6 +152,49 @@ class ExtensionManager:
         backend_payload = self.create_backend_payload(extended_table)
         return extended_table, backend_payload
 
+    def extend_columns(self, table, jobs, max_workers=4):
+        """
+        Extends several columns of the same table, sending the extension requests concurrently.
+
+        The requests share the manager's session and are all built from the table as
+        given, so the jobs must be independent: a job cannot read a column added by
+        another job in the same call. Responses are merged into the table in the order
+        of ``jobs``.
+
+        :param table: the table to extend
+        :param jobs: list of dicts holding the keyword arguments of extend_column
+                     (reconciliated_column_name, id_extender, properties,
+                     date_column_name, decimal_format)
+        :param max_workers: (optional) maximum number of requests in flight
+        :return: the extended table and the backend payload
+        :raises ValueError: if a job refers to a column that is not in the table
+        """
+        for job in jobs:
+            for column_name in (job['reconciliated_column_name'], job.get('date_column_name')):
+                if column_name and column_name not in table['columns']:
+                    raise ValueError(
+                        f"Column '{column_name}' is not in the table; extend_columns jobs "
+                        "must only use columns that exist before the call."
+                    )
+
+        payloads = [
+            self.prepare_input_data(
+                table,
+                job['reconciliated_column_name'],
+                job['id_extender'],
+                job['properties'],
+                job.get('date_column_name'),
+                job.get('decimal_format')
+            ) for job in jobs
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            extension_responses = list(executor.map(self.send_extension_request, payloads))
+
+        for extension_response in extension_responses:
+            table = self.compose_extension_table(table, extension_response)
+        backend_payload = self.create_backend_payload(table)
+        return table, backend_payload
+
     def extend_reconciledColumnExt(self, table, reconciliated_column_name, id_extender, properties):
         input_data = self.prepare_input_data_reconciledColumnExt(table, reconciliated_column_name, properties, id_extender)
         extension_response = self.send_extension_request(input_data)
@@ -146,55 +202,85 @@ class ExtensionManager:
         backend_payload = self.create_backend_payload(extended_table)
         return extended_table, backend_payload
 
-    def get_extender(self, extender_id, response):
-            """
-            Given the extender's ID, returns the main information in JSON format
-    
-            :extender_id: the ID of the extender in question
-            :response: JSON containing information about the extenders
-            :return: JSON containing the main information of the extender
-            """
-            for extender in response:
-                if extender['id'] == extender_id:
-                    return {
-                        'name': extender['name'],
-                        'relativeUrl': extender['relativeUrl']
-                    }
+    def get_extender(self, extender_id, response=None):
+        """
+        Given the extender's ID, returns the main information in JSON format
+
+        :extender_id: the ID of the extender in question
+        :response: (optional) JSON containing information about the extenders;
+                   defaults to the cached extender list
+        :return: JSON containing the main information of the extender
+        """
+        if response is None or response is self._extender_cache:
+            extender = self._get_extender_index().get(extender_id)
+        else:
+            extender = next((item for item in response if item['id'] == extender_id), None)
+        if extender is None:
             return None
-        
-    def get_extender_data(self):
+        return {
+            'name': extender['name'],
+            'relativeUrl': extender['relativeUrl']
+        }
+
+    def _get_extender_index(self):
+        """
+        Returns the extenders keyed by ID, fetching the list if the cache is empty or stale
+        """
+        if not self.get_extender_data():
+            return {}
+        return self._extender_by_id
+
+    def clear_extender_cache(self):
+        """
+        Drops the cached extender list so the next lookup hits the backend again
+        """
+        self._extender_cache = None
+        self._extender_cache_ts = 0
+        self._extender_by_id = {}
+
+    def get_extender_data(self, use_cache=True):
         """
         Retrieves extender data from the backend
+
+        :use_cache: reuse the last successful response if it is younger than cache_ttl seconds
         """
+        if use_cache and self._extender_cache is not None and time.time() - self._extender_cache_ts < self.cache_ttl:
+            return self._extender_cache
         try:
             # Correctly construct the URL
             url = urljoin(self.api_url, 'extenders/list')
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url, headers=self.headers)
             response.raise_for_status()
             
             # Debugging output
-            print(f"Response status code: {response.status_code}")
-            print(f"Response headers: {response.headers}")
-            print(f"Response content: {response.text[:200]}...")  # Print first 200 characters
+            logger.debug("Response status code: %s", response.status_code)
+            logger.debug("Response headers: %s", response.headers)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response content: %s...", response.text[:200])
             
             # Check if the response is JSON
             content_type = response.headers.get('Content-Type', '')
             if 'application/json' not in content_type:
-                print(f"Unexpected content type: {content_type}")
-                print("Full response content:")
-                print(response.text)
+                logger.error("Unexpected content type: %s", content_type)
+                logger.error("Full response content: %s", response.text)
                 return None
             
-            return response.json()
+            self._extender_cache = orjson.loads(response.content)
+            self._extender_cache_ts = time.time()
+            self._extender_by_id = {
+                extender['id']: extender for extender in self._extender_cache
+                if isinstance(extender, dict) and 'id' in extender
+            } if isinstance(self._extender_cache, list) else {}
+            return self._extender_cache
         except requests.RequestException as e:
-            print(f"Error occurred while retrieving extender data: {e}")
+            logger.error("Error occurred while retrieving extender data: %s", e)
             if e.response is not None:
-                print(f"Response status code: {e.response.status_code}")
-                print(f"Response content: {e.response.text[:200]}...")
+                logger.error("Response status code: %s", e.response.status_code)
+                logger.error("Response content: %s...", e.response.text[:200])
             return None
         except json.JSONDecodeError as e:
-            print(f"JSON decoding error: {e}")
-            print(f"Raw response content: {response.text}")
+            logger.error("JSON decoding error: %s", e)
+            logger.error("Raw response content: %s", response.text)
             return None
     
     def get_extenders_list(self):
@@ -214,11 +300,11 @@ class ExtensionManager:
         :param service_list: data regarding available services
         :return: DataFrame containing reconciliators information
         """
-        reconciliators = pd.DataFrame(columns=["id", "relativeUrl", "name"])
-        for reconciliator in service_list:
-            reconciliators.loc[len(reconciliators)] = [
-            reconciliator["id"], reconciliator["relativeUrl"], reconciliator["name"]]
-        return reconciliators
+        return pd.DataFrame(
+            [{"id": service["id"], "relativeUrl": service["relativeUrl"], "name": service["name"]}
+             for service in service_list],
+            columns=["id", "relativeUrl", "name"]
+        )
     def get_extender_parameters(self, extender_id, print_params=False):
         """
         Retrieves the parameters needed for a specific extender service.
@@ -227,66 +313,59 @@ class ExtensionManager:
         :param print_params: (optional) Whether to print the retrieved parameters or not.
         :return: A dictionary containing the parameter details, or None if the extender is not found.
         """
-        extender_data = self.get_extender_data()
-        if not extender_data:
+        extender_index = self._get_extender_index()
+        if not extender_index:
             return None
         
-        for extender in extender_data:
-            if extender['id'] == extender_id:
-                parameters = extender.get('formParams', [])
-                mandatory_params = [
-                    {
-                        'name': param['id'],
-                        'type': param['inputType'],
-                        'mandatory': 'required' in param.get('rules', []),
-                        'description': param.get('description', ''),
-                        'label': param.get('label', ''),
-                        'infoText': param.get('infoText', ''),
-                        'options': param.get('options', [])
-                    } for param in parameters if 'required' in param.get('rules', [])
-                ]
-                optional_params = [
-                    {
-                        'name': param['id'],
-                        'type': param['inputType'],
-                        'mandatory': 'required' in param.get('rules', []),
-                        'description': param.get('description', ''),
-                        'label': param.get('label', ''),
-                        'infoText': param.get('infoText', ''),
-                        'options': param.get('options', [])
-                    } for param in parameters if 'required' not in param.get('rules', [])
-                ]
-
-                param_dict = {
-                    'mandatory': mandatory_params,
-                    'optional': optional_params
-                }
+        extender = extender_index.get(extender_id)
+        if extender is None:
+            logger.warning("Extender with ID '%s' not found.", extender_id)
+            return None
 
-                if print_params:
-                    print(f"Parameters for extender '{extender_id}':")
-                    print("Mandatory parameters:")
-                    for param in param_dict['mandatory']:
-                        print(f"- {param['name']} ({param['type']}): Mandatory")
-                        print(f"  Description: {param['description']}")
-                        print(f"  Label: {param['label']}")
-                        print(f"  Info Text: {param['infoText']}")
-                        print(f"  Options: {param['options']}")
-                        print("")
-
-                    print("Optional parameters:")
-                    for param in param_dict['optional']:
-                        print(f"- {param['name']} ({param['type']}): Optional")
-                        print(f"  Description: {param['description']}")
-                        print(f"  Label: {param['label']}")
-                        print(f"  Info Text: {param['infoText']}")
-                        print(f"  Options: {param['options']}")
-                        print("")
-
-                return param_dict
-
-        print(f"Extender with ID '{extender_id}' not found.")
-        return None
+        parameters = extender.get('formParams', [])
+        mandatory_params, optional_params = [], []
+        for param in parameters:
+            is_required = 'required' in (param.get('rules') or ())
+            entry = {
+                'name': param['id'],
+                'type': param['inputType'],
+                'mandatory': is_required,
+                'description': param.get('description', ''),
+                'label': param.get('label', ''),
+                'infoText': param.get('infoText', ''),
+                'options': param.get('options', [])
+            }
+            (mandatory_params if is_required else optional_params).append(entry)
+
+        param_dict = {
+            'mandatory': mandatory_params,
+            'optional': optional_params
+        }
+
+        if print_params:
+            print(f"Parameters for extender '{extender_id}':")
+            print("Mandatory parameters:")
+            self._print_parameters(param_dict['mandatory'], "Mandatory")
+            print("Optional parameters:")
+            self._print_parameters(param_dict['optional'], "Optional")
+
+        return param_dict
     
+    def _print_parameters(self, params, kind):
+        """
+        Prints the details of a list of extender parameters.
+
+        :param params: the parameter entries built by get_extender_parameters
+        :param kind: label printed next to each parameter ('Mandatory' or 'Optional')
+        """
+        for param in params:
+            print(f"- {param['name']} ({param['type']}): {kind}")
+            print(f"  Description: {param['description']}")
+            print(f"  Label: {param['label']}")
+            print(f"  Info Text: {param['infoText']}")
+            print(f"  Options: {param['options']}")
+            print("")
+
     def get_parameter_options(self, extender_id, parameter_name):
         """
         Retrieves the options for a specified parameter of an extender service.
@@ -295,15 +374,15 @@ class ExtensionManager:
         :param parameter_name: the name of the parameter to retrieve options for
         :return: a list of option IDs if found, None otherwise
         """
-        extender_params = self.get_extender_parameters(extender_id)
-        if not extender_params:
+        extender = self._get_extender_index().get(extender_id)
+        if extender is None:
+            logger.warning("Extender with ID '%s' not found.", extender_id)
             return None
 
-        for param_type in ['mandatory', 'optional']:
-            for param in extender_params[param_type]:
-                if param['name'] == parameter_name:
-                    options = param.get('options', [])
-                    if options:
-                        return [option['id'] for option in options]
+        for param in extender.get('formParams', []):
+            if param['id'] == parameter_name:
+                options = param.get('options', [])
+                if options:
+                    return [option['id'] for option in options]
 
         return None
\ No newline at end of file
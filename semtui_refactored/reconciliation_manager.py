@@ -1,16 +1,39 @@
 import requests
 import json
+import orjson
 import copy
 import pandas as pd 
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
+from urllib3.util.retry import Retry
 from .token_manager import TokenManager
+from .utils import calculate_annotation_stats, create_session
 
 class ReconciliationManager:
-    def __init__(self, base_url, token_manager):
+    def __init__(self, base_url, token_manager, session=None, cache_ttl=300):
         self.base_url = base_url.rstrip('/') + '/'
         self.api_url = urljoin(self.base_url, 'api/')
         self.token_manager = token_manager
+        if session is None:
+            # Back off exponentially on 429/5xx, waiting as long as the server's
+            # Retry-After asks; once retries run out the last response is
+            # returned so raise_for_status reports the real status. An injected
+            # session is the caller's and keeps its own retry policy
+            session = create_session(retries=Retry(
+                total=6,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET", "POST"]),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            ))
+        self.session = session
+        self.cache_ttl = cache_ttl
+        self._reconciliator_cache = None
+        self._reconciliator_cache_ts = 0
+        self._reconciliator_by_id = {}
 
     def _get_headers(self):
         return {
@@ -20,22 +43,29 @@ class ReconciliationManager:
         }
 
     def prepare_input_data(self, original_input, column_name, reconciliator_id, optional_columns):
+        rows = original_input['rows']
+        items = [{"id": column_name, "label": column_name}]
+        items.extend(
+            {"id": f"{row_id}${column_name}", "label": row_data['cells'][column_name]['label']}
+            for row_id, row_data in rows.items()
+        )
         input_data = {
             "serviceId": reconciliator_id,
-            "items": [{"id": column_name, "label": column_name}],
+            "items": items,
             "secondPart": {},
             "thirdPart": {}
         }
 
-        for row_id, row_data in original_input['rows'].items():
-            main_column_value = row_data['cells'][column_name]['label']
-            input_data['items'].append({"id": f"{row_id}${column_name}", "label": main_column_value})
-
-            if reconciliator_id in ['geocodingHere', 'geocodingGeonames']:
-                second_part_value = row_data['cells'].get(optional_columns[0], {}).get('label', '')
-                third_part_value = row_data['cells'].get(optional_columns[1], {}).get('label', '')
-                input_data['secondPart'][row_id] = [second_part_value, [], optional_columns[0]]
-                input_data['thirdPart'][row_id] = [third_part_value, [], optional_columns[1]]
+        if reconciliator_id in ['geocodingHere', 'geocodingGeonames']:
+            second_column, third_column = optional_columns[0], optional_columns[1]
+            second_part = input_data['secondPart']
+            third_part = input_data['thirdPart']
+            for row_id, row_data in rows.items():
+                cells = row_data['cells']
+                second_cell = cells.get(second_column)
+                third_cell = cells.get(third_column)
+                second_part[row_id] = [second_cell.get('label', '') if second_cell else '', [], second_column]
+                third_part[row_id] = [third_cell.get('label', '') if third_cell else '', [], third_column]
 
         return input_data
 
@@ -44,60 +74,81 @@ class ReconciliationManager:
         headers = self._get_headers()
         
         try:
-            response = requests.post(url, json=input_data, headers=headers)
+            response = self.session.post(url, data=orjson.dumps(input_data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS), headers=headers)
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return orjson.loads(response.content)
+        except (requests.RequestException, json.JSONDecodeError, orjson.JSONEncodeError) as e:
+            self.clear_reconciliator_cache()
             print(f"Error: {e}")
             return None
 
     
     def compose_reconciled_table(self, original_input, reconciliation_output, column_name):
         final_payload = copy.deepcopy(original_input)
+        return self._apply_reconciliation(final_payload, reconciliation_output, column_name)
+
+    def _apply_reconciliation(self, final_payload, reconciliation_output, column_name):
+        """
+        Writes one column's reconciliation output into final_payload in place and returns it
+        """
+        table_info = final_payload['table']
+        column = final_payload['columns'][column_name]
 
         # Update only the necessary fields
-        final_payload['table']['lastModifiedDate'] = datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        table_info['lastModifiedDate'] = datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
         
         # Update the reconciled column information
-        final_payload['columns'][column_name]['status'] = 'reconciliated'
-        final_payload['columns'][column_name]['context'] = {
+        n_items = len(reconciliation_output) - 1
+        column['status'] = 'reconciliated'
+        column['context'] = {
             'georss': {
                 'uri': 'http://www.google.com/maps/place/',
-                'total': len(reconciliation_output) - 1,
-                'reconciliated': len(reconciliation_output) - 1
+                'total': n_items,
+                'reconciliated': n_items
             }
         }
-        final_payload['columns'][column_name]['kind'] = 'entity'
-        final_payload['columns'][column_name]['annotationMeta'] = {
+        column['kind'] = 'entity'
+        column['annotationMeta'] = {
             'annotated': True,
             'match': {'value': True},
             'lowestScore': 1,
             'highestScore': 1
         }
 
-        column_metadata = next(item for item in reconciliation_output if item['id'] == column_name)
-        final_payload['columns'][column_name]['metadata'] = column_metadata['metadata']
-
-        # Update cell information for the reconciled column
+        # Update cell information for the reconciled column, picking out the
+        # column-level entry in the same pass
+        rows = final_payload['rows']
+        column_metadata = None
         nCellsReconciliated = 0
         for item in reconciliation_output:
-            if item['id'] != column_name:
-                row_id, cell_id = item['id'].split('$')
-                cell = final_payload['rows'][row_id]['cells'][cell_id]
+            item_id = item['id']
+            if item_id == column_name:
+                column_metadata = item
+                continue
 
-                metadata = item['metadata'][0]
-                cell['metadata'] = [metadata]
+            row_id, cell_id = item_id.split('$', 1)
+            row = rows.get(row_id)
+            cell = row['cells'].get(cell_id) if row is not None else None
+            if cell is None:
+                continue
+
+            metadata = item['metadata'][0]
+            score = metadata['score']
+            cell['metadata'] = [metadata]
+            cell['annotationMeta'] = {
+                'annotated': True,
+                'match': {'value': metadata['match']},
+                'lowestScore': score,
+                'highestScore': score
+            }
+            nCellsReconciliated += 1
 
-                cell['annotationMeta'] = {
-                    'annotated': True,
-                    'match': {'value': metadata['match']},
-                    'lowestScore': metadata['score'],
-                    'highestScore': metadata['score']
-                }
-                nCellsReconciliated += 1
+        if column_metadata is None:
+            raise ValueError(f"Reconciliation output has no entry for column '{column_name}'.")
+        column['metadata'] = column_metadata['metadata']
 
         # Update nCellsReconciliated in the table information
-        final_payload['table']['nCellsReconciliated'] = nCellsReconciliated
+        table_info['nCellsReconciliated'] = nCellsReconciliated
 
         return final_payload
 
@@ -112,97 +163,91 @@ class ReconciliationManager:
             column = payload['columns'][column_key]
     
             # Build new metadata
-            new_metadata = [{
-                'id': 'None:',
-                'match': True,
-                'score': 0,
-                'name': {'value': '', 'uri': ''},
-                'entity': []
-            }]
-    
-            for item in column.get('metadata', []):
-                new_entity = {
+            entities = [
+                {
                     'id': item['id'],
                     'name': {
                         'value': item['name'],
-                        'uri': f"{base_uri}{item['id'].split(':')[-1]}"
+                        'uri': f"{base_uri}{item['id'].rpartition(':')[2]}"
                     },
                     'score': 0,  # Column metadata score is set to 0
                     'match': True,
                     'type': [{'id': t['id'], 'name': t['name']} for t in item.get('type', [])]
-                }
-                new_metadata[0]['entity'].append(new_entity)
-    
-            column['metadata'] = new_metadata
-
-            # Compute lowest and highest scores from cell metadata
-            scores = []
-            for row in payload['rows'].values():
-                cell = row['cells'].get(column_key)
-                if cell and 'metadata' in cell and len(cell['metadata']) > 0:
-                    score = cell['metadata'][0].get('score', 0)
-                    scores.append(score)
-    
-            column['annotationMeta'] = {
-                'annotated': True,
-                'match': {'value': True, 'reason': 'reconciliator'},
-                'lowestScore': min(scores) if scores else 0,
-                'highestScore': max(scores) if scores else 0
-            }
+                } for item in column.get('metadata', [])
+            ]
+            column['metadata'] = [{
+                'id': 'None:',
+                'match': True,
+                'score': 0,
+                'name': {'value': '', 'uri': ''},
+                'entity': entities
+            }]
     
             if 'kind' in column:
                 del column['kind']
         
-        # Restructure rows
+        # Restructure rows, tracking each column's [lowest, highest] cell score on the way
+        score_bounds = {}
         for row in payload['rows'].values():
-            for cell_key, cell in row['cells'].items():
-                if cell_key in reconciliated_columns:
-                    if 'metadata' in cell:
-                        for idx, item in enumerate(cell['metadata']):
-                            # Build item with fields in desired order
-                            new_item = {}
-                            new_item['id'] = item['id']
-                            new_item['name'] = {
+            cells = row['cells']
+            for column_key in reconciliated_columns:
+                cell = cells.get(column_key)
+                if cell is None:
+                    continue
+                if 'metadata' in cell:
+                    for idx, item in enumerate(cell['metadata']):
+                        # Build item with fields in desired order
+                        item_id = item['id']
+                        new_item = {
+                            'id': item_id,
+                            'name': {
                                 'value': item['name'],
-                                'uri': f"{base_uri}{item['id'].split(':')[-1]}"
+                                'uri': f"{base_uri}{item_id.rpartition(':')[2]}"
                             }
-                            if 'feature' in item:
-                                new_item['feature'] = item['feature']
-                            new_item['score'] = item.get('score', 0)
-                            new_item['match'] = True  # Set match to True
-                            new_item['type'] = [{'id': t['id'], 'name': t['name']} for t in item.get('type', [])]
-    
-                            # Replace the item in cell['metadata'] with the new dictionary
-                            cell['metadata'][idx] = new_item
-    
-                    if 'annotationMeta' in cell:
-                        cell['annotationMeta']['match'] = {'value': True, 'reason': 'reconciliator'}
-                        # Set lowestScore and highestScore from cell's score
-                        if 'metadata' in cell and len(cell['metadata']) > 0:
-                            score = cell['metadata'][0].get('score', 0)
-                            cell['annotationMeta']['lowestScore'] = score
-                            cell['annotationMeta']['highestScore'] = score
-    
+                        }
+                        if 'feature' in item:
+                            new_item['feature'] = item['feature']
+                        new_item['score'] = item.get('score', 0)
+                        new_item['match'] = True  # Set match to True
+                        new_item['type'] = [{'id': t['id'], 'name': t['name']} for t in item.get('type', [])]
+
+                        # Replace the item in cell['metadata'] with the new dictionary
+                        cell['metadata'][idx] = new_item
+
+                metadata = cell.get('metadata')
+                if metadata:
+                    score = metadata[0].get('score', 0)
+                    bounds = score_bounds.get(column_key)
+                    if bounds is None:
+                        score_bounds[column_key] = [score, score]
+                    elif score < bounds[0]:
+                        bounds[0] = score
+                    elif score > bounds[1]:
+                        bounds[1] = score
+
+                if 'annotationMeta' in cell:
+                    cell['annotationMeta']['match'] = {'value': True, 'reason': 'reconciliator'}
+                    # Set lowestScore and highestScore from cell's score
+                    if metadata:
+                        cell['annotationMeta']['lowestScore'] = score
+                        cell['annotationMeta']['highestScore'] = score
+
+        for column_key in reconciliated_columns:
+            lowest, highest = score_bounds.get(column_key, (0, 0))
+            payload['columns'][column_key]['annotationMeta'] = {
+                'annotated': True,
+                'match': {'value': True, 'reason': 'reconciliator'},
+                'lowestScore': lowest,
+                'highestScore': highest
+            }
+
         return payload
     
     def create_backend_payload(self, final_payload):
-        nCellsReconciliated = sum(
-            1 for row in final_payload['rows'].values()
-            for cell in row['cells'].values()
-            if cell.get('annotationMeta', {}).get('annotated', False)
-        )
-        all_scores = [
-            cell.get('annotationMeta', {}).get('lowestScore', float('inf'))
-            for row in final_payload['rows'].values()
-            for cell in row['cells'].values()
-            if cell.get('annotationMeta', {}).get('annotated', False)
-        ]
-        minMetaScore = min(all_scores) if all_scores else 0
-        maxMetaScore = max(all_scores) if all_scores else 1
-    
         table_data = final_payload['table']
         columns = final_payload.get('columns', {})
         rows = final_payload.get('rows', {})
+        nCellsReconciliated, minMetaScore, maxMetaScore = calculate_annotation_stats(rows)
     
         backend_payload = {
             "tableInstance": {
@@ -219,11 +264,11 @@ class ReconciliationManager:
             },
             "columns": {
                 "byId": columns,
-                "allIds": list(columns.keys())
+                "allIds": list(columns)
             },
             "rows": {
                 "byId": rows,
-                "allIds": list(rows.keys())
+                "allIds": list(rows)
             }
         }
     
@@ -248,11 +293,71 @@ class ReconciliationManager:
         else:
             return None, None
 
-    def get_reconciliator_data(self):
+    def reconcile_columns(self, table_data, column_names, reconciliator_id, optional_columns, max_workers=8):
+        """
+        Reconciles several columns of the same table with one reconciliator.
+
+        The reconciliators take one column per request, so the requests are sent
+        concurrently and their outputs are composed into a single table, which is
+        restructured and turned into a backend payload once.
+
+        :param table_data: the table to reconcile
+        :param column_names: the names of the columns to reconcile
+        :param reconciliator_id: the ID of the reconciliator to use
+        :param optional_columns: optional columns passed to geocoding reconciliators
+        :param max_workers: (optional) maximum number of requests in flight
+        :return: the reconciled table and the backend payload, or (None, None) if any request failed
+        """
+        if reconciliator_id not in ['geocodingHere', 'geocodingGeonames', 'geonames']:
+            raise ValueError("Invalid reconciliator ID. Please use 'geocodingHere', 'geocodingGeonames', or 'geonames'.")
+        if not column_names:
+            raise ValueError("No columns given to reconcile.")
+
+        input_data = [
+            self.prepare_input_data(table_data, column_name, reconciliator_id, optional_columns)
+            for column_name in column_names
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = list(executor.map(lambda data: self.send_reconciliation_request(data, reconciliator_id), input_data))
+
+        if not all(responses):
+            return None, None
+
+        # Copy the table once and apply every column's output to that copy
+        final_payload = copy.deepcopy(table_data)
+        for column_name, response_data in zip(column_names, responses):
+            self._apply_reconciliation(final_payload, response_data, column_name)
+        final_payload = self.restructure_payload(final_payload)
+        backend_payload = self.create_backend_payload(final_payload)
+        return final_payload, backend_payload
+
+    def reconcile_many(self, jobs, max_workers=8):
+        """
+        Runs several independent reconciliations concurrently over the shared session.
+
+        :param jobs: list of (table_data, column_name, reconciliator_id, optional_columns)
+                     tuples, i.e. the positional arguments of reconcile
+        :param max_workers: (optional) maximum number of requests in flight
+        :return: a list of (final_payload, backend_payload) tuples in the order of jobs
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda job: self.reconcile(*job), jobs))
+
+    def clear_reconciliator_cache(self):
+        """
+        Drops the cached reconciliator list so the next lookup hits the backend again
+        """
+        self._reconciliator_cache = None
+        self._reconciliator_cache_ts = 0
+        self._reconciliator_by_id = {}
+
+    def get_reconciliator_data(self, use_cache=True):
+        if use_cache and self._reconciliator_cache is not None and time.time() - self._reconciliator_cache_ts < self.cache_ttl:
+            return self._reconciliator_cache
         try:
             url = urljoin(self.api_url, 'reconciliators/list')
             headers = self._get_headers()
-            response = requests.get(url, headers=headers)
+            response = self.session.get(url, headers=headers)
             response.raise_for_status()
             
             print(f"Response status code: {response.status_code}")
@@ -267,10 +372,16 @@ class ReconciliationManager:
                 print(response.text)
                 return None
             
-            return response.json()
+            self._reconciliator_cache = orjson.loads(response.content)
+            self._reconciliator_cache_ts = time.time()
+            self._reconciliator_by_id = {
+                reconciliator['id']: reconciliator for reconciliator in self._reconciliator_cache
+                if isinstance(reconciliator, dict) and 'id' in reconciliator
+            } if isinstance(self._reconciliator_cache, list) else {}
+            return self._reconciliator_cache
         except requests.RequestException as e:
             print(f"Request error occurred while retrieving reconciliator data: {e}")
-            if hasattr(e, 'response') and e.response is not None:
+            if e.response is not None:
                 print(f"Response status code: {e.response.status_code}")
                 print(f"Response content: {e.response.text[:200]}...")
             return None
@@ -279,6 +390,14 @@ class ReconciliationManager:
             print(f"Raw response content: {response.text}")
             return None
 
+    def _get_reconciliator_index(self):
+        """
+        Returns the reconciliators keyed by ID, fetching the list if the cache is empty or stale
+        """
+        if not self.get_reconciliator_data():
+            return {}
+        return self._reconciliator_by_id
+
     def get_reconciliators_list(self):
         response = self.get_reconciliator_data()
         if response is not None:
@@ -294,18 +413,15 @@ class ReconciliationManager:
             print(f"Expected a list, but got {type(service_list)}: {service_list}")
             return pd.DataFrame()
 
+        columns = ["id", "relativeUrl", "name"]
         reconciliators = []
         for reconciliator in service_list:
-            if isinstance(reconciliator, dict) and all(key in reconciliator for key in ["id", "relativeUrl", "name"]):
-                reconciliators.append({
-                    "id": reconciliator["id"],
-                    "relativeUrl": reconciliator["relativeUrl"],
-                    "name": reconciliator["name"]
-                })
+            if isinstance(reconciliator, dict) and all(key in reconciliator for key in columns):
+                reconciliators.append({key: reconciliator[key] for key in columns})
             else:
                 print(f"Skipping invalid reconciliator data: {reconciliator}")
         
-        return pd.DataFrame(reconciliators)
+        return pd.DataFrame(reconciliators, columns=columns)
     
     def get_reconciliator_parameters(self, id_reconciliator, print_params=False):
         """
@@ -321,44 +437,40 @@ class ReconciliationManager:
             {'name': 'idReconciliator', 'type': 'string', 'mandatory': True, 'description': 'The ID of the reconciliator to use'}
         ]
         
-        reconciliator_data = self.get_reconciliator_data()
-        if not reconciliator_data:
+        reconciliator = self._get_reconciliator_index().get(id_reconciliator)
+        if reconciliator is None:
             return None
 
-        for reconciliator in reconciliator_data:
-            if reconciliator['id'] == id_reconciliator:
-                parameters = reconciliator.get('formParams', [])
-                optional_params = [
-                    {
-                        'name': param['id'],
-                        'type': param['inputType'],
-                        'mandatory': 'required' in param.get('rules', []),
-                        'description': param.get('description', ''),
-                        'label': param.get('label', ''),
-                        'infoText': param.get('infoText', '')
-                    } for param in parameters
-                ]
-
-                param_dict = {
-                    'mandatory': mandatory_params,
-                    'optional': optional_params
-                }
-
-                if print_params:
-                    print(f"Parameters for reconciliator '{id_reconciliator}':")
-                    print("Mandatory parameters:")
-                    for param in param_dict['mandatory']:
-                        print(f"- {param['name']} ({param['type']}): Mandatory")
-                        print(f"  Description: {param['description']}")
-                    
-                    print("\nOptional parameters:")
-                    for param in param_dict['optional']:
-                        mandatory = "Mandatory" if param['mandatory'] else "Optional"
-                        print(f"- {param['name']} ({param['type']}): {mandatory}")
-                        print(f"  Description: {param['description']}")
-                        print(f"  Label: {param['label']}")
-                        print(f"  Info Text: {param['infoText']}")
-
-                return param_dict
-
-        return None
\ No newline at end of file
+        parameters = reconciliator.get('formParams', [])
+        optional_params = [
+            {
+                'name': param['id'],
+                'type': param['inputType'],
+                'mandatory': 'required' in param.get('rules', []),
+                'description': param.get('description', ''),
+                'label': param.get('label', ''),
+                'infoText': param.get('infoText', '')
+            } for param in parameters
+        ]
+
+        param_dict = {
+            'mandatory': mandatory_params,
+            'optional': optional_params
+        }
+
+        if print_params:
+            print(f"Parameters for reconciliator '{id_reconciliator}':")
+            print("Mandatory parameters:")
+            for param in param_dict['mandatory']:
+                print(f"- {param['name']} ({param['type']}): Mandatory")
+                print(f"  Description: {param['description']}")
+            
+            print("\nOptional parameters:")
+            for param in param_dict['optional']:
+                mandatory = "Mandatory" if param['mandatory'] else "Optional"
+                print(f"- {param['name']} ({param['type']}): {mandatory}")
+                print(f"  Description: {param['description']}")
+                print(f"  Label: {param['label']}")
+                print(f"  Info Text: {param['infoText']}")
+
+        return param_dict
\ No newline at end of file
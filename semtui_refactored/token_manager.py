@@ -1,6 +1,7 @@
 import requests
 import json
 import time
+import threading
 import jwt
 
 class TokenManager:
@@ -11,10 +12,14 @@ class TokenManager:
         self.password = password
         self.token = None
         self.expiry = 0
+        self._refresh_lock = threading.Lock()
 
     def get_token(self):
         if self.token is None or time.time() >= self.expiry:
-            self.refresh_token()
+            # Threads sharing the manager sign in once; the rest wait and reuse the new token
+            with self._refresh_lock:
+                if self.token is None or time.time() >= self.expiry:
+                    self.refresh_token()
         return self.token
 
     def refresh_token(self):
@@ -38,7 +43,7 @@ class TokenManager:
                 
         except requests.RequestException as e:
             print(f"Sign-in request failed: {e}")
-            if hasattr(e, 'response'):
+            if e.response is not None:
                 print(f"Response status code: {e.response.status_code}")
                 print(f"Response content: {e.response.text}")
             self.token = None
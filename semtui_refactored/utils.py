@@ -4,10 +4,136 @@ import tempfile
 import pandas as pd
 import requests
 import json
+import orjson
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urljoin
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
 from .token_manager import TokenManager
 
+def create_session(headers: Optional[Dict[str, str]] = None, pool_connections: int = 10,
+                   pool_maxsize: int = 20, retries: Optional[Retry] = None) -> requests.Session:
+    """
+    Creates a requests Session with a pooled HTTP adapter mounted for http and https.
+
+    Args:
+        headers (Dict[str, str], optional): Default headers sent with every request.
+        pool_connections (int): Number of connection pools to cache.
+        pool_maxsize (int): Maximum number of connections kept per pool.
+        retries (Retry, optional): Retry policy; defaults to 3 retries on 502/503/504.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    if retries is None:
+        retries = Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+def _annotated_meta(cell: Dict) -> Optional[Dict]:
+    """
+    Returns the cell's annotationMeta if the cell is annotated, None otherwise.
+    """
+    try:
+        annotation_meta = cell['annotationMeta']
+        return annotation_meta if annotation_meta['annotated'] else None
+    except (KeyError, TypeError):
+        return None
+
+def parse_w3c_json(json_data: List[Dict]) -> pd.DataFrame:
+    """
+    Parses the W3C JSON format into a pandas DataFrame.
+
+    Args:
+        json_data (List[Dict]): The W3C JSON data.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the parsed data.
+    """
+    # Extract column names from the first item (metadata)
+    columns = [key for key in json_data[0].keys() if key.startswith('th')]
+    column_names = [json_data[0][col]['label'] for col in columns]
+
+    # Extract data rows, skipping the first item (metadata)
+    data_rows = [[item[col]['label'] for col in column_names] for item in islice(json_data, 1, None)]
+
+    # Create DataFrame
+    df = pd.DataFrame(data_rows, columns=column_names)
+    return df
+
+def calculate_annotation_stats(rows: Dict) -> Tuple[int, float, float]:
+    """
+    Counts the annotated cells of a table and the bounds of their lowest scores
+    in a single pass, without materializing the scores.
+
+    Args:
+        rows (Dict): The table rows, keyed by row ID.
+
+    Returns:
+        Tuple[int, float, float]: (nCellsReconciliated, minMetaScore, maxMetaScore);
+            the score bounds default to (0, 1) when no cell is annotated.
+    """
+    n_annotated = 0
+    lowest = highest = None
+    for row in rows.values():
+        for cell in row['cells'].values():
+            annotation_meta = _annotated_meta(cell)
+            if annotation_meta is None:
+                continue
+            n_annotated += 1
+            score = annotation_meta.get('lowestScore', float('inf'))
+            if lowest is None:
+                lowest = highest = score
+            elif score < lowest:
+                lowest = score
+            elif score > highest:
+                highest = score
+    if not n_annotated:
+        return 0, 0, 1
+    return n_annotated, lowest, highest
+
+def save_dataframe(df: pd.DataFrame, output_file: str, file_format: str = 'parquet') -> str:
+    """
+    Saves a DataFrame locally, by default in the columnar Parquet format.
+
+    Parquet and Feather are much smaller and faster to write than CSV; both
+    require pyarrow (available as the ``arrow`` extra).
+
+    Args:
+        df (pd.DataFrame): The DataFrame to save.
+        output_file (str): The path of the file to write.
+        file_format (str): 'parquet' (zstd compressed), 'feather' (lz4 compressed) or 'csv'.
+            Defaults to 'parquet'.
+
+    Returns:
+        str: The path to the saved file.
+
+    Raises:
+        ImportError: If a Parquet or Feather file is requested and pyarrow is not installed.
+    """
+    if file_format == 'csv':
+        df.to_csv(output_file, index=False)
+        return output_file
+    if file_format not in ('parquet', 'feather'):
+        raise ValueError(f"Unsupported file format '{file_format}'. Please use 'parquet', 'feather', or 'csv'.")
+    try:
+        if file_format == 'parquet':
+            df.to_parquet(output_file, compression='zstd')
+        else:
+            df.to_feather(output_file, compression='lz4')
+    except ImportError as e:
+        raise ImportError(
+            f"Saving as {file_format} requires pyarrow; install it with 'pip install semtui[arrow]' "
+            "or pass file_format='csv'."
+        ) from e
+    return output_file
+
 class Utility:
     def __init__(self, api_url: str, token_manager: TokenManager):
         self.api_url = api_url.rstrip('/') + '/'
@@ -34,10 +160,10 @@ class Utility:
         """
         def send_request(data: Dict, url: str) -> requests.Response:
             try:
-                response = requests.put(url, json=data, headers=self.headers, timeout=30)
+                response = requests.put(url, data=orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS), headers=self.headers, timeout=30)
                 response.raise_for_status()
                 return response
-            except requests.RequestException as e:
+            except (requests.RequestException, orjson.JSONEncodeError) as e:
                 if enable_logging:
                     print(f"Request failed: {str(e)}")
                 return None
@@ -123,27 +249,5 @@ class Utility:
         else:
             raise Exception(f"Failed to download W3C JSON. Status code: {response.status_code}")
 
-    def parse_w3c_json(self, json_data: List[Dict]) -> pd.DataFrame:
-        """
-        Parses the W3C JSON format into a pandas DataFrame.
-
-        Args:
-            json_data (List[Dict]): The W3C JSON data.
-
-        Returns:
-            pd.DataFrame: A DataFrame containing the parsed data.
-        """
-        # Extract column names from the first item (metadata)
-        columns = [key for key in json_data[0].keys() if key.startswith('th')]
-        column_names = [json_data[0][col]['label'] for col in columns]
-
-        # Extract data rows
-        data_rows = []
-        for item in json_data[1:]:  # Skip the first item (metadata)
-            row = [item[col]['label'] for col in column_names]
-            data_rows.append(row)
-
-        # Create DataFrame
-        df = pd.DataFrame(data_rows, columns=column_names)
-        return df
-          
\ No newline at end of file
+    # parse_w3c_json now lives at module level; this alias keeps Utility.parse_w3c_json working
+    parse_w3c_json = staticmethod(parse_w3c_json)
@@ -10,8 +10,12 @@ setup(
         'chardet',
         'PyJWT',
         'fake-useragent',
-        'requests',  # Add other dependencies as needed
+        'requests',
+        'orjson',  # Add other dependencies as needed
     ],
+    extras_require={
+        'arrow': ['pyarrow'],
+    },
     author='Alidu Abubakari',
     author_email='a.abubakari@campus.unimib.it',
     description='A utility package for Semantic Enrichment of Tables',